@@ -3,20 +3,42 @@
 # Standard library imports
 import os
 import argparse
+import functools
+import hashlib
+import json
+import shlex
 import subprocess
 import glob
-import gzip
 import random
 import pyreadr
+from concurrent.futures import ThreadPoolExecutor
 
 # Third-party imports
+import anndata as ad
+import numba
 import numpy as np
 import pandas as pd
 import scanpy as sc
 import loompy as lp
 import seaborn as sns
 import matplotlib.pyplot as plt
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import rapidgzip
 import umap
+from scipy import linalg, sparse
+from scipy.cluster.hierarchy import leaves_list, linkage
+from scipy.cluster.vq import kmeans2
+
+# Optional GPU UMAP (RAPIDS cuML), only used when a CUDA device is visible; falls back to umap-learn.
+# On CPU-only nodes the import or the device query can fail with CUDA runtime errors, not just ImportError.
+try:
+    import cupy
+    from cuml.manifold import UMAP as cuUMAP
+    if cupy.cuda.runtime.getDeviceCount() == 0:
+        cuUMAP = None
+except Exception:
+    cuUMAP = None
 
 # Set global configurations
 sc.settings.seed = 42  # Set Scanpy's random seed
@@ -28,6 +50,153 @@ random.seed(42)  # Python random module
 np.random.seed(42)  # NumPy module
 
 
+@numba.njit(parallel=True, cache=True)
+def _csr_qc_metrics(data, indices, indptr, mt_mask):
+    """
+    Compute per-cell QC metrics in a single pass over a CSR matrix.
+
+    Args:
+        data (np.ndarray): CSR data array.
+        indices (np.ndarray): CSR column indices.
+        indptr (np.ndarray): CSR row pointers.
+        mt_mask (np.ndarray): Boolean mask over genes marking mitochondrial genes.
+
+    Returns:
+        tuple: Arrays with the number of detected genes, total counts and mitochondrial counts per cell.
+    """
+    n_rows = indptr.shape[0] - 1
+    n_genes = np.zeros(n_rows, dtype=np.int32)
+    n_counts = np.zeros(n_rows, dtype=np.float32)
+    mt_counts = np.zeros(n_rows, dtype=np.float32)
+
+    for i in numba.prange(n_rows):
+        nnz = 0
+        total = 0.0
+        mt_total = 0.0
+        for j in range(indptr[i], indptr[i + 1]):
+            value = data[j]
+            if value > 0:
+                nnz += 1
+            total += value
+            if mt_mask[indices[j]]:
+                mt_total += value
+        n_genes[i] = nnz
+        n_counts[i] = total
+        mt_counts[i] = mt_total
+
+    return n_genes, n_counts, mt_counts
+
+
+@numba.njit(parallel=True, cache=True)
+def _group_mean(values, codes, n_groups):
+    """
+    Compute the column means of a dense matrix per group of rows.
+
+    Args:
+        values (np.ndarray): Matrix of shape (n_rows, n_cols).
+        codes (np.ndarray): Group code per row; rows with a negative code are ignored.
+        n_groups (int): Number of groups.
+
+    Returns:
+        np.ndarray: Matrix of shape (n_groups, n_cols) with the mean per group, NaN for empty groups.
+    """
+    n_rows, n_cols = values.shape
+    counts = np.zeros(n_groups, dtype=np.int64)
+    for i in range(n_rows):
+        if codes[i] >= 0:
+            counts[codes[i]] += 1
+
+    # Parallelize over columns so every thread owns its output column
+    out = np.zeros((n_groups, n_cols), dtype=np.float64)
+    for j in numba.prange(n_cols):
+        for i in range(n_rows):
+            if codes[i] >= 0:
+                out[codes[i], j] += values[i, j]
+        for g in range(n_groups):
+            out[g, j] = out[g, j] / counts[g] if counts[g] > 0 else np.nan
+
+    return out
+
+
+@functools.lru_cache(maxsize=None)
+def find_ranking_databases(databases_dir):
+    """
+    Find the cisTarget ranking databases, scanning each databases directory only once.
+
+    Args:
+        databases_dir (str): Directory containing the *.feather ranking databases.
+
+    Returns:
+        str: Space-separated paths of the ranking databases.
+    """
+    return ' '.join(glob.glob(os.path.join(databases_dir, '*.feather')))
+
+
+def subset_cells(adata, mask):
+    """
+    Build a lean AnnData holding only the selected cells.
+
+    X, obs, var and the category colors of the kept obs columns are carried over; .raw, embeddings,
+    neighbor graphs and other unstructured annotations are dropped instead of being copied along
+    with the subset.
+
+    Args:
+        adata (AnnData): Annotated data object (or view) to subset.
+        mask (array-like): Boolean mask over cells.
+
+    Returns:
+        AnnData: New AnnData object with the selected cells, independent of the input.
+    """
+    subset = adata[np.flatnonzero(mask)]
+
+    # Materialize the matrix so the result does not keep pointing at the discarded view
+    X = sparse.csr_matrix(subset.X, copy=True) if sparse.issparse(subset.X) else np.array(subset.X)
+
+    obs = subset.obs.copy()
+    uns = {}
+    for column in obs.select_dtypes('category'):
+        obs[column] = obs[column].cat.remove_unused_categories()
+
+        # Keep plot colors consistent with the full dataset, trimmed to the remaining categories
+        colors_key = f"{column}_colors"
+        if colors_key in adata.uns:
+            colors = dict(zip(adata.obs[column].cat.categories, adata.uns[colors_key]))
+            uns[colors_key] = np.array([colors[category] for category in obs[column].cat.categories])
+
+    return ad.AnnData(X=X, obs=obs, var=subset.var.copy(), uns=uns)
+
+
+def start_command(command):
+    """
+    Start a command-line step without going through a shell.
+
+    Args:
+        command (str): Command string to execute.
+
+    Returns:
+        subprocess.Popen: Handle of the running process.
+    """
+    print("Executing command: %s", command)
+    return subprocess.Popen(shlex.split(command))
+
+
+def wait_command(process, outputs=None):
+    """
+    Wait for a started command and raise if it failed.
+
+    Args:
+        process (subprocess.Popen): Handle returned by start_command.
+        outputs (dict, optional): Mapping of temporary output paths to final paths. They are only
+                                  renamed once the command succeeded, so an interrupted run never
+                                  leaves a partial file at the final path.
+    """
+    returncode = process.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, process.args)
+    for temporary_path, final_path in (outputs or {}).items():
+        os.replace(temporary_path, final_path)
+
+
 class DataLoader:
     """Handles loading and initial processing of data."""
 
@@ -74,9 +243,8 @@ class DataLoader:
             'anndata': anndata_path  # This now points to the correct location
         }
 
-        # Ensure all directories exist
-        for folder in [paths['output'], paths['figures']]:
-            os.makedirs(folder, exist_ok=True)
+        # Ensure all directories exist (the figures folder lives inside the output folder)
+        os.makedirs(paths['figures'], exist_ok=True)
 
         # Adjust output path for pruning if applicable
         if pruning is not None:
@@ -89,19 +257,22 @@ class DataLoader:
         # Define specific file paths
         paths.update({
             'human_tfs': os.path.join(paths['databases'], 'allTFs_hg38.txt'),
-            'ranking_dbs': ' '.join(glob.glob(os.path.join(paths['databases'], '*.feather'))),
+            'ranking_dbs': find_ranking_databases(paths['databases']),
             'motif_annotations': os.path.join(paths['databases'], 'motifs-v10nr_clust-nr.hgnc-m0.001-o0.0.tbl'),
             'raw_matrix': os.path.join(paths['raw_data'],
                                        f'ccRCC_{sample_id}',
                                        f'{sample_id}_snRNA_ccRCC',
                                        'outs',
                                        'raw_feature_bc_matrix'),
-            'metadata': os.path.join(paths['raw_data'], 'GSE240822_GBM_ccRCC_RNA_metadata_CPTAC_samples.tsv.gz'),
+            'metadata': os.path.join(paths['raw_data'], 'GSE240822_GBM_ccRCC_RNA_metadata_CPTAC_samples.tsv.bgz'),
+            'metadata_gz': os.path.join(paths['raw_data'], 'GSE240822_GBM_ccRCC_RNA_metadata_CPTAC_samples.tsv.gz'),
             'filtered_loom': os.path.join(paths['output'], f'{suffix}filtered_scenic.loom'),
-            'adjacencies': os.path.join(paths['output'], f'{suffix}adjacencies.csv'),
+            'adjacencies': os.path.join(paths['output'], f'{suffix}adjacencies.tsv'),
             'regulons': os.path.join(paths['output'], f'{suffix}reg.csv'),
             'pyscenic_output': os.path.join(paths['output'], f'{suffix}pyscenic_output.loom'),
-            'aucell_mtx': os.path.join(paths['output'], f'{suffix}auc.csv')
+            'aucell_mtx': os.path.join(paths['output'], f'{suffix}auc.csv'),
+            'scaled_matrix': os.path.join(paths['output'], 'X_scaled.f32.npy'),
+            'scaled_matrix_meta': os.path.join(paths['output'], 'X_scaled.json')
         })
 
         return paths
@@ -117,12 +288,18 @@ class DataLoader:
         adata = sc.read_10x_mtx(self.paths['raw_matrix'], var_names='gene_symbols', cache=False)
         sc.pp.filter_cells(adata, min_genes=0)
 
-        # Compute additional QC metrics
-        adata.obs['n_genes'] = (adata.X > 0).sum(axis=1).A1
-        adata.obs['percent_mito'] = np.sum(adata[:, adata.var_names.str.startswith('MT-')].X, axis=1).A1 / np.sum(
-            adata.X,
-            axis=1).A1
-        adata.obs['n_counts'] = adata.X.sum(axis=1).A1
+        # Keep counts in single precision so all downstream dense steps move half the bytes
+        adata.X = adata.X.astype(np.float32, copy=False)
+
+        # Compute additional QC metrics in a single pass over the sparse matrix
+        X = sparse.csr_matrix(adata.X)
+        mt_mask = adata.var_names.str.startswith('MT-').to_numpy()
+        n_genes, n_counts, mt_counts = _csr_qc_metrics(X.data, X.indices, X.indptr, mt_mask)
+        adata.obs['n_genes'] = n_genes
+        # Empty droplets in the raw matrix have no counts; leave their ratio undefined
+        adata.obs['percent_mito'] = np.divide(mt_counts, n_counts, out=np.full_like(mt_counts, np.nan),
+                                              where=n_counts > 0)
+        adata.obs['n_counts'] = n_counts
 
         return adata
 
@@ -205,19 +382,26 @@ class DataPreprocessor:
         Returns:
             AnnData: The AnnData object with metadata joined to its `.obs` attribute.
         """
-        print("Adding metadata from %s", self.paths['metadata'])
-
-        # Read the metadata file
-        with gzip.open(self.paths['metadata'], 'rt') as f:
-            metadata = pd.read_csv(f, sep='\t')
-
-        print("Total metadata rows loaded: %d", len(metadata))
-
-        # Filter metadata: Check if GEO.sample starts with self.sample_id (partial match)
-        metadata_filtered = metadata[
-            metadata['GEO.sample'].str.startswith(sample_id)
-        ]
-
+        # Prefer the BGZF copy made by run_pySCENIC.sh; rapidgzip also inflates the original gzip in parallel
+        metadata_path = self.paths['metadata']
+        if not os.path.exists(metadata_path):
+            metadata_path = self.paths['metadata_gz']
+        print("Adding metadata from %s", metadata_path)
+
+        # Stream the metadata in chunks (parallel decompression of the BGZF file) and keep only rows
+        # where GEO.sample starts with sample_id (partial match)
+        total_rows = 0
+        filtered_chunks = []
+        with rapidgzip.open(metadata_path, parallelization=sc.settings.njobs) as f:
+            chunks = pd.read_csv(f, sep='\t', chunksize=200_000,
+                                 usecols=['GEO.sample', 'Barcode', 'cell_type.harmonized.cancer'],
+                                 dtype={'GEO.sample': 'string', 'Barcode': 'string'})
+            for chunk in chunks:
+                total_rows += len(chunk)
+                filtered_chunks.append(chunk[chunk['GEO.sample'].str.startswith(sample_id, na=False)])
+        metadata_filtered = pd.concat(filtered_chunks, ignore_index=True)
+
+        print("Total metadata rows loaded: %d", total_rows)
         print("Rows filtered for sample ID '%s': %d", sample_id, len(metadata_filtered))
 
         # Match barcodes
@@ -227,7 +411,7 @@ class DataPreprocessor:
         print("Rows with matching barcodes: %d", len(metadata_filtered))
 
         # Filter AnnData object to only include matching barcodes
-        self.adata = self.adata[self.adata.obs_names.isin(metadata_filtered['Barcode'])].copy()
+        self.adata = subset_cells(self.adata, self.adata.obs_names.isin(metadata_filtered['Barcode']))
 
         print("AnnData object filtered to %d cells", self.adata.n_obs)
 
@@ -264,17 +448,132 @@ class DataPreprocessor:
         sc.pl.highly_variable_genes(self.adata)
 
         # Keep only highly variable genes
-        self.adata = self.adata[:, self.adata.var['highly_variable']]
+        self.adata = self.adata[:, self.adata.var['highly_variable']].copy()
 
-        # Regress out unwanted variation and scale data
-        sc.pp.regress_out(self.adata, ['n_counts', 'percent_mito'])
-        sc.pp.scale(self.adata, max_value=10)
+        # Regress out unwanted variation and scale data, reusing a cached result for identical input
+        regress_vars = ['n_counts', 'percent_mito']
+        cache_key = self.scaled_matrix_key(regress_vars, max_value=10)
+        if self.load_scaled_matrix(cache_key):
+            print("Loaded cached regressed and scaled matrix from %s", self.paths['scaled_matrix'])
+        else:
+            self.regress_out(regress_vars)
+            sc.pp.scale(self.adata, max_value=10)
+            self.save_scaled_matrix(cache_key)
 
         # Save the preprocessed data
         self.adata.write(self.paths['anndata'])
         print("Preprocessed data saved to %s", self.paths['anndata'])
         return self.adata
 
+    def regress_out(self, keys):
+        """
+        Regress out observation covariates from all genes with a single least-squares solve.
+
+        Each gene is fitted against an intercept plus the given covariates, equivalent to
+        sc.pp.regress_out, but all genes share one factorization of the design matrix.
+
+        Args:
+            keys (list): Observation keys to regress out.
+        """
+        X = self.adata.X.toarray() if sparse.issparse(self.adata.X) else self.adata.X
+        Y = np.asarray(X, dtype=np.float32)
+        design = np.column_stack(
+            [np.ones(self.adata.n_obs)] + [self.adata.obs[key].to_numpy() for key in keys]
+        ).astype(np.float32)
+        beta, *_ = linalg.lstsq(design, Y, lapack_driver='gelsd')
+        self.adata.X = Y - design @ beta
+
+    def scaled_matrix_key(self, regress_vars, max_value):
+        """
+        Compute a content hash identifying the input of the regress-out and scaling step.
+
+        Args:
+            regress_vars (list): Observation keys regressed out of the expression matrix.
+            max_value (float): Clipping value used when scaling.
+
+        Returns:
+            str: Hexadecimal digest of the expression matrix, covariates and parameters.
+        """
+        h = hashlib.blake2b(digest_size=16)
+        h.update(json.dumps({'regress_vars': regress_vars, 'max_value': max_value}).encode())
+        h.update('\n'.join(self.adata.obs_names).encode())
+        h.update('\n'.join(self.adata.var_names).encode())
+        X = self.adata.X
+        arrays = [X.data, X.indices, X.indptr] if sparse.issparse(X) else [X]
+        arrays += [self.adata.obs[var].to_numpy() for var in regress_vars]
+        for array in arrays:
+            h.update(np.ascontiguousarray(array).tobytes())
+        return h.hexdigest()
+
+    def load_scaled_matrix(self, cache_key):
+        """
+        Attach a cached regressed and scaled matrix as a read-only memory map if its key matches.
+
+        The per-gene mean and std that sc.pp.scale stores in .var are restored alongside it.
+
+        Args:
+            cache_key (str): Content hash of the current input.
+
+        Returns:
+            bool: True if the cached matrix was attached, False otherwise.
+        """
+        if not (os.path.exists(self.paths['scaled_matrix']) and os.path.exists(self.paths['scaled_matrix_meta'])):
+            return False
+
+        # Any unreadable, mismatched or stale cache is treated as a miss and recomputed
+        try:
+            with open(self.paths['scaled_matrix_meta']) as f:
+                meta = json.load(f)
+            if meta.get('key') != cache_key:
+                return False
+            var = {column: np.array(values['values'], dtype=values['dtype'])
+                   for column, values in meta['var'].items()}
+            X = np.load(self.paths['scaled_matrix'], mmap_mode='r')
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring unreadable scaled matrix cache: {e}")
+            return False
+
+        if X.shape != (self.adata.n_obs, self.adata.n_vars) or any(len(v) != self.adata.n_vars for v in var.values()):
+            print("Ignoring scaled matrix cache with mismatched shape %s", X.shape)
+            return False
+
+        self.adata.X = X
+        for column, values in var.items():
+            self.adata.var[column] = values
+        return True
+
+    def save_scaled_matrix(self, cache_key):
+        """
+        Store the regressed and scaled matrix as float32 together with its content hash and the
+        per-gene mean and std that sc.pp.scale stored in .var.
+
+        Both files are written under temporary names and renamed into place, the matrix first and
+        the key last, so an interrupted run never leaves a key pointing at the wrong matrix.
+
+        Args:
+            cache_key (str): Content hash of the input the matrix was computed from.
+        """
+        self.adata.X = np.asarray(self.adata.X, dtype=np.float32)
+        var = {
+            column: {'values': self.adata.var[column].tolist(), 'dtype': str(self.adata.var[column].dtype)}
+            for column in ['mean', 'std']
+        }
+
+        # Invalidate the old key before its matrix is replaced
+        if os.path.exists(self.paths['scaled_matrix_meta']):
+            os.remove(self.paths['scaled_matrix_meta'])
+
+        partial_matrix = f"{self.paths['scaled_matrix']}.partial"
+        with open(partial_matrix, 'wb') as f:
+            np.save(f, self.adata.X)
+        os.replace(partial_matrix, self.paths['scaled_matrix'])
+
+        partial_meta = f"{self.paths['scaled_matrix_meta']}.partial"
+        with open(partial_meta, 'w') as f:
+            json.dump({'key': cache_key, 'var': var}, f)
+        os.replace(partial_meta, self.paths['scaled_matrix_meta'])
+        print("Regressed and scaled matrix cached to %s", self.paths['scaled_matrix'])
+
 
 class ClusterVisualizer:
     """Handles clustering and visualization of data."""
@@ -342,6 +641,7 @@ class GRNInference:
             paths (dict): Dictionary containing file paths.
         """
         self.paths = paths
+        self.loom_digest = None
 
     def create_loom_file(self, adata):
         """
@@ -354,38 +654,118 @@ class GRNInference:
             None
         """
         print("Creating loom file at %s", self.paths['filtered_loom'])
+        # Reuse the QC metrics from read_expression_data, falling back to one fused pass if they were dropped
+        if {'n_genes', 'n_counts'}.issubset(adata.obs.columns):
+            n_genes = adata.obs['n_genes'].to_numpy().astype(np.int32)
+            n_counts = adata.obs['n_counts'].to_numpy().astype(np.float32)
+        else:
+            X = sparse.csr_matrix(adata.X)
+            n_genes, n_counts, _ = _csr_qc_metrics(X.data, X.indices, X.indptr, np.zeros(adata.n_vars, dtype=bool))
+
         row_attrs = {"Gene": np.array(adata.var_names)}
         col_attrs = {
             "CellID": np.array(adata.obs_names),
-            "nGene": np.array(np.sum(adata.X > 0, axis=1)).flatten(),
-            "nUMI": np.array(np.sum(adata.X, axis=1)).flatten(),
+            "nGene": n_genes,
+            "nUMI": n_counts,
             "expr_louvain": np.array(adata.obs['louvain']),
             "cell_type.harmonized.cancer": np.array(adata.obs['cell_type.harmonized.cancer'])
         }
-        lp.create(self.paths['filtered_loom'], adata.X.transpose(), row_attrs, col_attrs)
+        # Loom stores genes as rows; keep sparse input sparse and cell-major so it is written without densifying
+        matrix = adata.X.T.tocsc() if sparse.issparse(adata.X) else adata.X.T
+        lp.create(self.paths['filtered_loom'], matrix, row_attrs, col_attrs)
         print("Loom file created at: %s", self.paths['filtered_loom'])
 
-    def run_grn_inference(self):
+        # Loom files embed creation timestamps, so identify their content by hashing what was written
+        h = hashlib.blake2b(digest_size=16)
+        h.update('\n'.join(adata.var_names).encode())
+        h.update('\n'.join(adata.obs_names).encode())
+        arrays = [matrix.data, matrix.indices, matrix.indptr] if sparse.issparse(matrix) else [matrix]
+        for array in arrays:
+            h.update(np.ascontiguousarray(array).tobytes())
+        self.loom_digest = h.hexdigest()
+
+    def run_grn_inference(self, use_dask=False):
         """
-        Run Gene Regulatory Network (GRN) inference using PySCENIC.
+        Run Gene Regulatory Network (GRN) inference using GRNBoost2.
+
+        By default the inference runs through pySCENIC's arboreto_with_multiprocessing.py script, which
+        avoids the overhead of the dask scheduler used by `pyscenic grn`. The adjacencies are written to a
+        path keyed by a hash of the loom content, the TF list and the command flags, so a rerun on
+        identical input can reuse them instead of recomputing.
+
+        Args:
+            use_dask (bool, optional): Whether to fall back to the dask-based `pyscenic grn` command.
+                                       Defaults to False.
 
         Returns:
-            dict: Dictionary with the command string and output path for GRN inference.
+            dict: Dictionary with the command string, output path, content-addressed output path, the
+                  temporary path the command writes to, the Parquet copy of the output and whether
+                  the output already exists.
         """
-        command = f"pyscenic grn {self.paths['filtered_loom']} {self.paths['human_tfs']} -o {self.paths['adjacencies']} --num_workers 20"
+        if use_dask:
+            tool, output_flag, flags = "pyscenic grn", "-o", "--num_workers 20"
+        else:
+            tool, output_flag, flags = ("arboreto_with_multiprocessing.py", "--output",
+                                        "--method grnboost2 --num_workers 20 --seed 42")
+
+        h = hashlib.blake2b(digest_size=8)
+        h.update(self.loom_digest.encode())
+        with open(self.paths['human_tfs'], 'rb') as f:
+            h.update(f.read())
+        h.update(f"{tool} {flags}".encode())
+        root, ext = os.path.splitext(self.paths['adjacencies'])
+        cached_path = f"{root}.{h.hexdigest()}{ext}"
+        # Write to a temporary name first; it is renamed to cached_path only after a successful run
+        partial_path = f"{root}.{h.hexdigest()}.partial{ext}"
+
+        command = f"{tool} {self.paths['filtered_loom']} {self.paths['human_tfs']} {output_flag} {partial_path} {flags}"
         print("Running GRN inference with command: %s", command)
         return {
             'command': command,
-            'output_path': self.paths['adjacencies']
+            'output_path': self.paths['adjacencies'],
+            'cached_path': cached_path,
+            'partial_path': partial_path,
+            'parquet_path': f"{root}.{h.hexdigest()}.parquet",
+            'cached': os.path.exists(cached_path)
         }
 
-    def run_ctx_inference(self, pruning=None):
+    def link_cached_output(self, config):
+        """
+        Point the regular output path at the content-addressed output of a step.
+
+        Args:
+            config (dict): Step configuration with 'output_path' and 'cached_path'.
+        """
+        if os.path.lexists(config['output_path']):
+            os.remove(config['output_path'])
+        os.symlink(os.path.basename(config['cached_path']), config['output_path'])
+
+    def load_adjacencies(self, config):
+        """
+        Load the GRN adjacencies, converting them once to a zstd-compressed Parquet file.
+
+        Args:
+            config (dict): GRN step configuration with 'cached_path' and 'parquet_path'.
+
+        Returns:
+            pd.DataFrame: Adjacencies with TF, target and importance columns.
+        """
+        if not os.path.exists(config['parquet_path']):
+            table = pa_csv.read_csv(config['cached_path'], parse_options=pa_csv.ParseOptions(delimiter='\t'))
+            partial_path = f"{config['parquet_path']}.partial"
+            pq.write_table(table, partial_path, compression='zstd')
+            os.replace(partial_path, config['parquet_path'])
+        return pq.read_table(config['parquet_path']).to_pandas()
+
+    def run_ctx_inference(self, pruning=None, use_dask=False):
         """
         Run context inference using PySCENIC.
 
         Args:
             pruning (bool, optional): Whether to use pruning during context inference. If False, the --no_pruning flag is added.
                                       Defaults to None (no flag added).
+            use_dask (bool, optional): Whether to run with the dask multiprocessing backend instead of pySCENIC's
+                                       custom multiprocessing. Defaults to False.
 
         Returns:
             dict: Dictionary with the command string and output path for context inference.
@@ -395,7 +775,8 @@ class GRNInference:
             f"--annotations_fname {self.paths['motif_annotations']} "
             f"--expression_mtx_fname {self.paths['filtered_loom']} "
             f"--output {self.paths['regulons']} "
-            f"--mask_dropouts --num_workers 20"
+            f"--mask_dropouts --num_workers 20 "
+            f"--mode {'dask_multiprocessing' if use_dask else 'custom_multiprocessing'}"
         )
         if pruning is False:
             base_command += " --no_pruning"
@@ -432,6 +813,19 @@ class ResultVisualizer:
             paths (dict): Dictionary containing file paths.
         """
         self.paths = paths
+        self._aucell_mtx = None
+
+    def load_aucell_matrix(self):
+        """
+        Load the AUCell matrix from the pySCENIC output loom, reading the file only once.
+
+        Returns:
+            pd.DataFrame: AUC values with cells as rows and regulons as columns.
+        """
+        if self._aucell_mtx is None:
+            with lp.connect(self.paths['pyscenic_output'], mode='r', validate=False) as lf:
+                self._aucell_mtx = pd.DataFrame(lf.ca.RegulonsAUC, index=lf.ca.CellID).astype(np.float32)
+        return self._aucell_mtx
 
     def plot_gene_distribution(self, nGenesDetectedPerCell, cell_type):
         """
@@ -469,9 +863,17 @@ class ResultVisualizer:
         Perform dimensionality reduction on AUCell matrix using UMAP.
         """
         print("Performing dimensionality reduction on AUCell matrix")
-        # Apply UMAP dimensionality reduction
-        reducer = umap.UMAP(n_neighbors=10, min_dist=0.4, n_components=2, random_state=42)
-        umap_result = reducer.fit_transform(aucell_mtx)
+        # Apply UMAP dimensionality reduction, on the GPU when cuML and a device are available
+        umap_result = None
+        if cuUMAP is not None:
+            try:
+                reducer = cuUMAP(n_neighbors=10, min_dist=0.4, n_components=2, random_state=42)
+                umap_result = np.asarray(reducer.fit_transform(aucell_mtx.to_numpy(dtype=np.float32)))
+            except Exception as e:
+                print(f"GPU UMAP failed ({e}), falling back to CPU UMAP")
+        if umap_result is None:
+            reducer = umap.UMAP(n_neighbors=10, min_dist=0.4, n_components=2, random_state=42)
+            umap_result = reducer.fit_transform(aucell_mtx)
 
         # Store results in AnnData object
         adata.obsm['X_umap'] = umap_result
@@ -483,22 +885,50 @@ class ResultVisualizer:
 
         return pd.DataFrame(umap_result, columns=['UMAP1', 'UMAP2'])
 
+    def reduced_cell_order(self, data, n_clusters=100):
+        """
+        Order cells for a heatmap by hierarchically clustering k-means centroids.
+
+        Clustering every cell directly needs an O(n_cells^2) distance matrix; grouping the cells into
+        at most n_clusters centroids first keeps the linkage at O(n_clusters^2).
+
+        Args:
+            data (np.ndarray): Matrix with cells as rows.
+            n_clusters (int, optional): Number of k-means centroids. Defaults to 100.
+
+        Returns:
+            np.ndarray: Cell positions in heatmap order.
+        """
+        n_clusters = min(n_clusters, data.shape[0])
+        centroids, labels = kmeans2(data, n_clusters, minit='++', seed=42)
+        centroid_order = leaves_list(linkage(centroids, method='average'))
+
+        # Sort cells by the dendrogram position of their centroid
+        centroid_rank = np.empty(n_clusters, dtype=np.int64)
+        centroid_rank[centroid_order] = np.arange(n_clusters)
+        return np.argsort(centroid_rank[labels], kind='stable')
+
     def create_regulon_heatmap(self):
         """
         Create a heatmap of top regulons' activity across cell types.
         """
         print("Creating regulon heatmap")
         # Load AUCell matrix from loom file
-        with lp.connect(self.paths['pyscenic_output'], mode='r+', validate=False) as lf:
-            aucell_mtx = pd.DataFrame(lf.ca.RegulonsAUC, index=lf.ca.CellID)
+        aucell_mtx = self.load_aucell_matrix()
 
         # Load AnnData object
         adata = sc.read_h5ad(self.paths['anndata'])
-        common_cells = adata.obs_names.intersection(aucell_mtx.index)
+        common_cells = adata.obs_names.isin(aucell_mtx.index)
 
         # Assign cell types and compute mean AUC by cell type
-        aucell_mtx['cell_type'] = adata[common_cells].obs['cell_type.harmonized.cancer']
-        mean_auc_by_cell_type = aucell_mtx.groupby('cell_type').mean()
+        cell_types = pd.Categorical(
+            adata.obs['cell_type.harmonized.cancer'][common_cells].reindex(aucell_mtx.index)
+        )
+        mean_auc_by_cell_type = pd.DataFrame(
+            _group_mean(aucell_mtx.to_numpy(), cell_types.codes.astype(np.int64), len(cell_types.categories)),
+            index=pd.Index(cell_types.categories, name='cell_type'),
+            columns=aucell_mtx.columns
+        )
 
         # Normalize and clean data
         mean_auc_by_cell_type = mean_auc_by_cell_type.replace([float('inf'), float('-inf')], pd.NA).dropna(how='all')
@@ -531,8 +961,7 @@ class ResultVisualizer:
         """
         print("Plotting top %d regulons", num_top_regulons)
         # Load AUCell matrix
-        with lp.connect(self.paths['pyscenic_output'], mode='r+', validate=False) as lf:
-            aucell_mtx = pd.DataFrame(lf.ca.RegulonsAUC, index=lf.ca.CellID)
+        aucell_mtx = self.load_aucell_matrix()
 
         # Select top regulons based on mean expression
         top_regulons = aucell_mtx.mean(axis=0).nlargest(num_top_regulons)
@@ -543,13 +972,29 @@ class ResultVisualizer:
         scaled_aucell_mtx = scaled_aucell_mtx.replace([float('inf'), float('-inf')], pd.NA).dropna(how='all')
         max_abs_value = np.max(np.abs(scaled_aucell_mtx.values))
 
+        # Quantize the z-scores to uint8 over the symmetric color range; the heatmap and clustering
+        # only need approximate values (undefined scores map to the neutral midpoint)
+        scores = scaled_aucell_mtx.T.to_numpy(dtype=np.float32, na_value=0)
+        quantized = pd.DataFrame(
+            np.rint((scores + max_abs_value) / (2 * max_abs_value) * 255).astype(np.uint8),
+            index=scaled_aucell_mtx.columns, columns=scaled_aucell_mtx.index
+        )
+
+        # Order cells via clustered k-means centroids instead of a per-cell dendrogram, which would need
+        # an O(n_cells^2) distance matrix; regulons are still clustered directly
+        cell_order = self.reduced_cell_order(quantized.T.to_numpy(dtype=np.float64) / 255)
+        quantized = quantized.iloc[:, cell_order]
+
         # Create heatmap with clustering
-        g = sns.clustermap(scaled_aucell_mtx.T, figsize=[12, 6.5], cmap=plt.cm.RdBu_r, xticklabels=False,
+        g = sns.clustermap(quantized, figsize=[12, 6.5], cmap=plt.cm.RdBu_r, xticklabels=False,
                            yticklabels=True,
-                           col_cluster=True, row_cluster=True, tree_kws={'linewidths': 0},
+                           col_cluster=False, row_cluster=True, tree_kws={'linewidths': 0},
                            cbar_kws={'location': 'right', 'label': 'Z-Score Normalized Regulon Activity'},
-                           dendrogram_ratio=0.1, cbar_pos=(0.92, .3, .015, 0.4), vmin=-max_abs_value,
-                           vmax=max_abs_value)
+                           dendrogram_ratio=0.1, cbar_pos=(0.92, .3, .015, 0.4), vmin=0, vmax=255)
+
+        # Label the color bar with z-scores instead of quantization levels
+        g.ax_cbar.set_yticks(np.linspace(0, 255, 5))
+        g.ax_cbar.set_yticklabels([f"{z:.1f}" for z in np.linspace(-max_abs_value, max_abs_value, 5)])
 
         # Customize heatmap appearance
         g.ax_heatmap.yaxis.tick_left()
@@ -638,7 +1083,7 @@ class WorkflowManager:
                 'Non-Tumor': adata.obs['cell_type.harmonized.cancer'] != 'Tumor'
             }
             if self.cell_type in subset_conditions:
-                adata = adata[subset_conditions[self.cell_type]].copy()
+                adata = subset_cells(adata, subset_conditions[self.cell_type].to_numpy())
                 print("Subsetted data for cell type: %s", self.cell_type)
             else:
                 print("Invalid cell type specified: %s. No subsetting applied.", self.cell_type)
@@ -659,29 +1104,37 @@ class WorkflowManager:
 
         # Step 2: Run GRN inference
         print("Step 2: Running GRN inference")
-        print("Executing command: %s", grn_inference_config['command'])
-        subprocess.run(grn_inference_config['command'], shell=True, check=True)
-        adjacencies = pd.read_csv(grn_inference_config['output_path'], index_col=False)
-
-        # Step 3: Run context-specific inference
-        print("Step 3: Running context-specific inference")
-        print("Executing command: %s", ctx_inference_config['command'])
-        subprocess.run(ctx_inference_config['command'], shell=True, check=True)
-        regulons = pd.read_csv(ctx_inference_config['output_path'], header=1)
+        if grn_inference_config['cached']:
+            print("Reusing cached adjacencies from %s", grn_inference_config['cached_path'])
+            grn_process = None
+        else:
+            grn_process = start_command(grn_inference_config['command'])
 
-        # Step 4: Visualize gene distribution
+        # Step 4: Visualize gene distribution while the pySCENIC steps are running
         print("Step 4: Visualizing gene distribution")
         gene_counts = np.sum(adata.X > 0, axis=1)
         result_visualizer = ResultVisualizer(data_loader.paths)
-        result_visualizer.plot_gene_distribution(gene_counts, self.cell_type)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            gene_distribution = executor.submit(result_visualizer.plot_gene_distribution, gene_counts,
+                                                self.cell_type)
+
+            if grn_process is not None:
+                wait_command(grn_process, {grn_inference_config['partial_path']: grn_inference_config['cached_path']})
+            grn_inference.link_cached_output(grn_inference_config)
+            adjacencies = grn_inference.load_adjacencies(grn_inference_config)
+
+            # Step 3: Run context-specific inference
+            print("Step 3: Running context-specific inference")
+            wait_command(start_command(ctx_inference_config['command']))
+            regulons = pd.read_csv(ctx_inference_config['output_path'], header=1)
+
+            # Step 5: Run AUCell
+            print("Step 5: Running AUCell")
+            wait_command(start_command(aucell_config['command']))
+            aucell_mtx = result_visualizer.load_aucell_matrix()
 
-        # Step 5: Run AUCell
-        print("Step 5: Running AUCell")
-        print("Executing command: %s", aucell_config['command'])
-        subprocess.run(aucell_config['command'], shell=True, check=True)
-        lf = lp.connect(aucell_config['output_path'], mode='r+', validate=False)
-        aucell_mtx = pd.DataFrame(lf.ca.RegulonsAUC, index=lf.ca.CellID)
-        lf.close()
+            # Plotting is not thread-safe, so finish the gene distribution before the next figures
+            gene_distribution.result()
 
         # Step 6: Dimensionality reduction on AUCell results
         print("Step 6: Dimensionality reduction on AUCell results")
@@ -739,7 +1192,7 @@ class WorkflowManager:
             print(f"Running PySCENIC for {len(valid_cells)} cells in {subcluster_name}")
 
             # Create subset AnnData
-            subcluster_adata = adata[adata.obs_names.isin(valid_cells)].copy()
+            subcluster_adata = subset_cells(adata, adata.obs_names.isin(valid_cells))
 
             # Run PySCENIC workflow for this subcluster
             try:
@@ -764,9 +1217,14 @@ class WorkflowManager:
                 aucell_config = grn_inference.run_aucell()
 
                 # Run the commands
-                subprocess.run(grn_inference_config['command'], shell=True, check=True)
-                subprocess.run(ctx_inference_config['command'], shell=True, check=True)
-                subprocess.run(aucell_config['command'], shell=True, check=True)
+                if grn_inference_config['cached']:
+                    print(f"Reusing cached adjacencies from {grn_inference_config['cached_path']}")
+                else:
+                    wait_command(start_command(grn_inference_config['command']),
+                                 {grn_inference_config['partial_path']: grn_inference_config['cached_path']})
+                grn_inference.link_cached_output(grn_inference_config)
+                wait_command(start_command(ctx_inference_config['command']))
+                wait_command(start_command(aucell_config['command']))
 
                 print(f"Successfully completed PySCENIC for subcluster {subcluster_name}")
 
@@ -19,6 +19,21 @@ DATA_FOLDER="/work/project/ladcol_020/datasets/"
 DATASET_ID="ccRCC_GBM/"
 SAMPLE_ID="C3L-00096-T1_CPT0001180011" #C3N-00495-T1_CPT0078510004 #C3L-00004-T1_CPT0001540013 #C3L-00917-T1_CPT0023690004
 
+# One-time BGZF copy of the metadata so it can be decompressed in parallel (the original is left untouched)
+set -o pipefail
+METADATA="${DATA_FOLDER}${DATASET_ID}GSE240822_GBM_ccRCC_RNA_metadata_CPTAC_samples.tsv.gz"
+METADATA_BGZF="${METADATA%.gz}.bgz"
+if [[ ! -f "$METADATA_BGZF" ]]; then
+    echo "Writing BGZF copy of the metadata: $METADATA_BGZF"
+    if zcat "$METADATA" | bgzip -@ 20 -c > "${METADATA_BGZF}.tmp" && bgzip -t "${METADATA_BGZF}.tmp"; then
+        mv "${METADATA_BGZF}.tmp" "$METADATA_BGZF"
+    else
+        rm -f "${METADATA_BGZF}.tmp"
+        echo "Error: BGZF conversion of the metadata failed."
+        exit 1
+    fi
+fi
+
 # Define the values for CELL_TYPE and PRUNE to loop over
 CELL_TYPES=("None" "Tumor" "Non-Tumor")  # Use "None" instead of ""
 PRUNE_FLAGS=("None")      # Use "None" instead of ""